@@ -1,9 +1,124 @@
+import fnmatch
+import functools
+import hashlib
+import json
+import operator
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice, repeat
 from pathlib import Path
-from typing import Set
+from typing import Callable, Iterator, NamedTuple, Set
 import click
 import pyperclip
 import pathspec
 
+# Characters that make an ignore pattern a glob rather than a plain name
+_GLOB_CHARS = frozenset('*?[\\')
+
+# Sort key for directory entries, extracted in C rather than by a lambda
+_name_getter = operator.attrgetter('name')
+
+# Lines handed to a writer per call when streaming, since click.echo flushes on every call
+_WRITE_BATCH = 256
+
+# Bumped whenever the tree output or the cache file layout changes
+_CACHE_VERSION = 1
+
+# Directories modified this close to a walk may change again within the same
+# timestamp tick, so trees containing them are not cached
+_RACY_WINDOW_NS = 2_000_000_000
+
+class _Gitignore(NamedTuple):
+    """Compiled .gitignore rules for files and for directories.
+
+    The combined regexes are None when the spec can't be merged, in which
+    case matching falls back to the spec itself.
+    """
+    spec: pathspec.PathSpec
+    dir_spec: pathspec.PathSpec
+    file_re: re.Pattern[str] | None
+    dir_re: re.Pattern[str] | None
+
+def _directory_lines(lines: list[str]) -> list[str]:
+    """Rewrite .gitignore lines for matching a directory by its own path.
+
+    Directories are matched without a trailing slash, so ``a/**`` hits what
+    is inside ``a`` but not ``a`` itself, and negations below it still apply.
+    Directory-only rules such as ``build/`` drop their slash to keep matching
+    the directory.
+    """
+    dir_lines = []
+    for line in lines:
+        stripped = line.rstrip('\r\n').rstrip(' ')
+        core = stripped.rstrip('/')
+        if stripped != core and core not in ('', '!') and not core.startswith('#'):
+            line = core
+        dir_lines.append(line)
+    return dir_lines
+
+def _combine_gitignore(spec: pathspec.PathSpec) -> re.Pattern[str] | None:
+    """Merge the compiled patterns of a PathSpec into a single regex.
+
+    Gitignore semantics are "last matching pattern wins", so each run of
+    include patterns is guarded by a negative lookahead over every negation
+    that follows it. The regex matches exactly the paths the spec ignores.
+
+    Returns:
+        re.Pattern | None: The combined regex, or None if the spec contains
+                           patterns that cannot be merged, in which case
+                           callers should fall back to spec.match_file()
+    """
+    terms = []
+    includes = []
+    negations = []
+    # Walk backwards so the negations seen so far are those after each include
+    for pattern in reversed(spec.patterns):
+        if pattern.include is None:
+            continue
+        regex = getattr(pattern, 'regex', None)
+        if not isinstance(regex, re.Pattern):
+            return None
+        # Named groups would clash once patterns are joined
+        source = re.sub(r'\(\?P<\w+>', '(?:', regex.pattern)
+        if pattern.include:
+            includes.append(source)
+            continue
+        if includes:
+            terms.append((includes, list(negations)))
+            includes = []
+        negations.append(source)
+    if includes:
+        terms.append((includes, list(negations)))
+
+    if not terms:
+        return None
+
+    alternatives = []
+    for includes, negations in terms:
+        guard = f"(?!{'|'.join(negations)})" if negations else ""
+        alternatives.append(f"{guard}(?:{'|'.join(includes)})")
+    try:
+        return re.compile('|'.join(alternatives))
+    except re.error:
+        return None
+
+@functools.lru_cache(maxsize=64)
+def _compile_gitignore(path: str, mtime_ns: int, size: int) -> _Gitignore:
+    """Parse and compile a .gitignore file.
+
+    The file's mtime and size are part of the cache key, so an edited file is
+    recompiled while repeated loads of an unchanged one reuse the same specs
+    and combined regexes.
+    """
+    with open(path) as f:
+        lines = f.readlines()
+    spec = pathspec.PathSpec.from_lines(pathspec.patterns.GitWildMatchPattern, lines)
+    dir_spec = pathspec.PathSpec.from_lines(pathspec.patterns.GitWildMatchPattern, _directory_lines(lines))
+    return _Gitignore(spec, dir_spec, _combine_gitignore(spec), _combine_gitignore(dir_spec))
+
 class DirectoryTree:
     # Default configuration
     DEFAULT_IGNORE_PATTERNS: Set[str] = {
@@ -18,34 +133,82 @@ class DirectoryTree:
         '*.pyd',
         '.DS_Store'
     }
+    # Number of threads scanning directories concurrently
+    SCAN_WORKERS: int = 8
+
+    # Tree glyphs, indexed by whether the entry is the last in its directory
+    _CONNECTORS: tuple[str, str] = ('├── ', '└── ')
+    _EXTENSIONS: tuple[str, str] = ('│   ', '    ')
 
-    def __init__(self, root_dir: Path, ignore_patterns: Set[str] | None = None):
+    def __init__(self, root_dir: Path, ignore_patterns: Set[str] | None = None, cache_dir: Path | None = None):
         """
         Initialize the DirectoryTree generator.
         
         Args:
             root_dir: Root directory to generate tree from
             ignore_patterns: Optional set of patterns to ignore. If None, uses DEFAULT_IGNORE_PATTERNS
+            cache_dir: Optional directory for caching generated trees. If None, caching is disabled
         """
         self.root_dir = root_dir
+        self.cache_dir = cache_dir
+        # Scanned entry paths all start with this, so stripping it yields the relative path
+        self._root_prefix = os.path.join(root_dir, '')
         self.ignore_patterns = ignore_patterns if ignore_patterns is not None else self.DEFAULT_IGNORE_PATTERNS
-        self.gitignore_spec = self._load_gitignore()
+        self._compile_ignore_patterns()
+        gitignore = self._load_gitignore()
+        self.gitignore_spec = gitignore.spec if gitignore is not None else None
+        self._gitignore_dir_spec = gitignore.dir_spec if gitignore is not None else None
+        self._gitignore_re = gitignore.file_re if gitignore is not None else None
+        self._gitignore_dir_re = gitignore.dir_re if gitignore is not None else None
+        self._dir_mtimes: dict[str, int] = {}
+        self._scan_errors = 0
+
+    def _compile_ignore_patterns(self) -> None:
+        """Partition ignore patterns into literal names, extension suffixes and globs.
+
+        Plain names are resolved with a set lookup and never reach the regex
+        engine. Globs are translated and combined into a single regex so that each
+        entry is matched once, independent of the number of patterns. As in
+        .gitignore, a trailing slash restricts a pattern to directories.
+        """
+        literals = set()
+        suffixes = []
+        globs = []
+        dir_literals = set()
+        dir_globs = []
+        for pattern in self.ignore_patterns:
+            if pattern.endswith('/'):
+                dir_pattern = pattern.rstrip('/')
+                if _GLOB_CHARS.isdisjoint(dir_pattern):
+                    dir_literals.add(dir_pattern)
+                else:
+                    dir_globs.append(fnmatch.translate(dir_pattern))
+            elif pattern.startswith('*.') and _GLOB_CHARS.isdisjoint(pattern[1:]):
+                suffixes.append(pattern[1:])
+            elif not _GLOB_CHARS.isdisjoint(pattern):
+                globs.append(fnmatch.translate(pattern))
+            else:
+                literals.add(pattern)
 
-    def _load_gitignore(self) -> pathspec.PathSpec | None:
+        self._literal_ignores: frozenset[str] = frozenset(literals)
+        self._ignore_suffixes: tuple[str, ...] = tuple(suffixes)
+        self._glob_ignore_re: re.Pattern[str] | None = re.compile('|'.join(globs)) if globs else None
+        self._literal_dir_ignores: frozenset[str] = frozenset(dir_literals)
+        self._glob_dir_ignore_re: re.Pattern[str] | None = re.compile('|'.join(dir_globs)) if dir_globs else None
+
+    def _load_gitignore(self) -> _Gitignore | None:
         """Load .gitignore patterns if the file exists.
         
         Returns:
-            pathspec.PathSpec | None: A PathSpec object containing the gitignore patterns,
-                                    or None if the file doesn't exist or has errors
+            _Gitignore | None: The compiled gitignore patterns for files and directories,
+                               or None if the file doesn't exist or has errors
         """
         try:
             gitignore_path = self.root_dir / '.gitignore'
-            if gitignore_path.exists():
-                with open(gitignore_path) as f:
-                    return pathspec.PathSpec.from_lines(
-                        pathspec.patterns.GitWildMatchPattern,
-                        f.readlines()
-                    )
+            st = gitignore_path.stat()
+            return _compile_gitignore(str(gitignore_path), st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            pass
         except IOError as e:
             click.echo(f"Warning: Could not read .gitignore file: {e}", err=True)
         except pathspec.PatternError as e:
@@ -54,100 +217,283 @@ class DirectoryTree:
             click.echo(f"Warning: Unexpected error processing .gitignore: {e}", err=True)
         return None
 
-    def should_ignore(self, path: Path) -> bool:
+    def should_ignore(self, entry: os.DirEntry) -> bool:
         """
-        Check if a path should be ignored based on configured patterns and .gitignore rules.
+        Check if a directory entry should be ignored based on configured patterns and .gitignore rules.
         
         Args:
-            path: Path to check
+            entry: Directory entry to check, as yielded by os.scandir()
             
         Returns:
-            bool: True if the path should be ignored, False otherwise
+            bool: True if the entry should be ignored, False otherwise
         """
-        try:
-            # Check against configured ignore patterns
-            if path.name in self.ignore_patterns:
-                return True
-            
-            # Check file extensions
-            if any(pattern.startswith('*.') and path.name.endswith(pattern[1:]) 
-                  for pattern in self.ignore_patterns):
-                return True
-            
-            # Check gitignore patterns if available
-            if self.gitignore_spec is not None:
-                rel_path = str(path.relative_to(self.root_dir))
-                return self.gitignore_spec.match_file(rel_path)
-            
-            return False
-        except ValueError as e:
-            click.echo(f"Warning: Error processing path {path}: {e}", err=True)
-            return False
+        name = entry.name
+        is_dir = entry.is_dir(follow_symlinks=False)
 
-    def _generate_tree(self, directory: Path, prefix: str = "", is_last: bool = True) -> str:
-        """Generate tree structure for a directory and its contents."""
-        name = directory.name + '/' if directory.is_dir() else directory.name
-        tree = f"{prefix}{'└── ' if is_last else '├── '}{name}\n"
+        # Check against configured ignore patterns
+        if name in self._literal_ignores:
+            return True
+        
+        # Check file extensions
+        if name.endswith(self._ignore_suffixes):
+            return True
 
-        if directory.is_dir():
-            try:
-                # Filter and sort directory contents
-                items = [
-                    item for item in sorted(directory.iterdir())
-                    if not self.should_ignore(item)
-                ]
-                
-                # Process each item
-                for i, item in enumerate(items):
-                    is_last_item = i == len(items) - 1
-                    new_prefix = prefix + ('    ' if is_last else '│   ')
-                    tree += self._generate_tree(
-                        item,
-                        prefix=new_prefix,
-                        is_last=is_last_item
-                    )
-            except PermissionError as e:
-                click.echo(f"Warning: Permission denied accessing {directory}: {e}", err=True)
-            except Exception as e:
-                click.echo(f"Warning: Error processing directory {directory}: {e}", err=True)
+        # Check remaining glob patterns
+        glob_re = self._glob_ignore_re
+        if glob_re is not None and glob_re.match(name):
+            return True
+
+        # Check directory-only patterns
+        if is_dir:
+            dir_glob_re = self._glob_dir_ignore_re
+            if name in self._literal_dir_ignores or (dir_glob_re is not None and dir_glob_re.match(name)):
+                return True
+        
+        # Check gitignore patterns if available
+        if self.gitignore_spec is not None:
+            rel_path = entry.path.removeprefix(self._root_prefix)
+            # An ignored directory is never scanned, as git never re-includes below it
+            if is_dir:
+                return self._match_gitignore(rel_path, self._gitignore_dir_spec, self._gitignore_dir_re)
+            return self._match_gitignore(rel_path, self.gitignore_spec, self._gitignore_re)
         
-        return tree
+        return False
+
+    @staticmethod
+    def _match_gitignore(rel_path: str, spec: pathspec.PathSpec, regex: re.Pattern[str] | None) -> bool:
+        """Check a relative path against a gitignore spec with its combined regex, if available."""
+        if regex is None:
+            return spec.match_file(rel_path)
+        if os.sep != '/':
+            rel_path = rel_path.replace(os.sep, '/')
+        return regex.match(rel_path) is not None
+
+    def _scan(self, directory: Path | str) -> list[os.DirEntry]:
+        """Return the non-ignored entries of a directory, directories first, then by name.
+
+        Entries are filtered before sorting, so ignored ones never reach the sort.
+        """
+        should_ignore = self.should_ignore
+        dirs = []
+        files = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not should_ignore(entry):
+                    (dirs if entry.is_dir(follow_symlinks=False) else files).append(entry)
+        # Sorting each group by name avoids building a tuple key per entry
+        dirs.sort(key=_name_getter)
+        files.sort(key=_name_getter)
+        dirs.extend(files)
+        return dirs
+
+    def _scan_recording(self, directory: str) -> list[os.DirEntry]:
+        """Like _scan(), but also record the directory's mtime for cache validation."""
+        # Stat before scanning, so a change during the scan invalidates the cache
+        mtime_ns = os.stat(directory).st_mtime_ns
+        entries = self._scan(directory)
+        self._dir_mtimes[directory.removeprefix(self._root_prefix)] = mtime_ns
+        return entries
+
+    def _walk(self, items: list[os.DirEntry], scan: Callable[[str], list[os.DirEntry]]) -> Iterator[str]:
+        """Yield the tree lines for the given root entries and their contents.
+
+        The walk is an explicit depth-first stack rather than recursion, so deep
+        trees neither pay per-level call overhead nor hit the recursion limit.
+        Lines are produced lazily, so callers can stream or join them.
+
+        Directory listings are prefetched on a thread pool, where scandir
+        releases the GIL: once a directory's listing is rendered, its child
+        directories are submitted for scanning, so siblings are read while
+        earlier subtrees are still being rendered. Only the listings of
+        directories waiting on the stack are held in memory.
+
+        Args:
+            items: Entries of the root directory
+            scan: Function returning the filtered, sorted entries of a directory
+        """
+        connectors = self._CONNECTORS
+        extensions = self._EXTENSIONS
+        pool = ThreadPoolExecutor(max_workers=self.SCAN_WORKERS)
+        submit = pool.submit
+        stack = []
+
+        def push(entries: list[os.DirEntry], prefix: str) -> None:
+            # Scans are submitted in sorted order, so the first directory rendered is read first;
+            # files carry no listing
+            listings = [
+                submit(scan, entry.path) if entry.is_dir(follow_symlinks=False) else None
+                for entry in entries
+            ]
+            # Children are pushed in reverse so they are popped in sorted order,
+            # which makes the first one pushed the last one in its directory
+            stack.extend(zip(reversed(entries), repeat(prefix), chain((True,), repeat(False)), reversed(listings)))
 
-    def generate(self) -> str:
-        """Generate the complete tree structure starting from root."""
         try:
-            tree = f"{self.root_dir.name}/\n"
-            
+            push(items, "")
+            while stack:
+                entry, prefix, is_last, listing = stack.pop()
+                if listing is None:
+                    yield f"{prefix}{connectors[is_last]}{entry.name}\n"
+                    continue
+
+                yield f"{prefix}{connectors[is_last]}{entry.name}/\n"
+                try:
+                    entries = listing.result()
+                except PermissionError as e:
+                    click.echo(f"Warning: Permission denied accessing {entry.path}: {e}", err=True)
+                    self._scan_errors += 1
+                    continue
+                except Exception as e:
+                    click.echo(f"Warning: Error processing directory {entry.path}: {e}", err=True)
+                    self._scan_errors += 1
+                    continue
+                if entries:
+                    push(entries, prefix + extensions[is_last])
+        finally:
+            # Also reached when the caller stops early, e.g. on a broken pipe
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _cache_path(self) -> Path:
+        """Return the cache file for this root directory and ignore configuration."""
+        key = hashlib.blake2b(digest_size=16)
+        for part in (str(_CACHE_VERSION), os.path.realpath(self.root_dir), self.root_dir.name,
+                     *sorted(self.ignore_patterns)):
+            key.update(part.encode('utf-8', 'surrogateescape') + b'\0')
+        return self.cache_dir / f"{key.hexdigest()}.json"
+
+    def _gitignore_signature(self) -> list[int] | None:
+        """Return the mtime and size of the root .gitignore, or None if it can't be read."""
+        try:
+            st = (self.root_dir / '.gitignore').stat()
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def _load_cached_tree(self) -> str | None:
+        """Return the cached tree if no directory it lists has changed since.
+
+        Any added, removed or renamed entry updates the mtime of its parent
+        directory, so comparing the recorded mtimes of every scanned directory
+        detects all changes without listing or matching anything.
+        """
+        try:
+            with open(self._cache_path(), encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached['gitignore'] != self._gitignore_signature():
+                return None
+            for rel_dir, mtime_ns in cached['dirs'].items():
+                if os.stat(os.path.join(self.root_dir, rel_dir)).st_mtime_ns != mtime_ns:
+                    return None
+            return cached['tree']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _store_cached_tree(self, tree: str, started_ns: int) -> None:
+        """Write the tree and the directory mtimes it was built from to the cache."""
+        if self._scan_errors or any(
+            mtime_ns >= started_ns - _RACY_WINDOW_NS for mtime_ns in self._dir_mtimes.values()
+        ):
+            return
+
+        cache_path = self._cache_path()
+        tmp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'gitignore': self._gitignore_signature(),
+                    'dirs': self._dir_mtimes,
+                    'tree': tree,
+                }, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            click.echo(f"Warning: Could not write tree cache: {e}", err=True)
+
+    def emit(self, write: Callable[[str], None]) -> bool:
+        """Write the complete tree structure starting from root, in batches of lines.
+
+        Lines are passed to write as they are rendered, so callers can stream the
+        tree instead of holding all of it in memory.
+
+        Args:
+            write: Function called with each chunk of output
+
+        Returns:
+            bool: True if the tree was written, False if it could not be generated
+        """
+        try:
+            caching = self.cache_dir is not None
+            if caching:
+                cached = self._load_cached_tree()
+                if cached is not None:
+                    write(cached)
+                    return True
+                started_ns = time.time_ns()
+                self._dir_mtimes = {'': os.stat(self.root_dir).st_mtime_ns}
+                self._scan_errors = 0
+
             # Filter and sort root directory contents
-            items = [
-                item for item in sorted(self.root_dir.iterdir())
-                if not self.should_ignore(item)
-            ]
-            
-            # Generate tree for each root item
-            for i, item in enumerate(items):
-                is_last = i == len(items) - 1
-                tree += self._generate_tree(item, is_last=is_last)
+            items = self._scan(self.root_dir)
             
-            return tree
+            # Render in sorted order while the directories below the root are scanned
+            scan = self._scan_recording if caching else self._scan
+            root_line = f"{self.root_dir.name}/\n"
+            if caching:
+                # The cache needs the whole tree, so buffer it before writing
+                tree = root_line + ''.join(self._walk(items, scan))
+                self._store_cached_tree(tree, started_ns)
+                write(tree)
+            else:
+                write(root_line)
+                lines = self._walk(items, scan)
+                for chunk in iter(lambda: ''.join(islice(lines, _WRITE_BATCH)), ''):
+                    write(chunk)
+            return True
+        except BrokenPipeError:
+            # The reader went away; let the caller decide how to stop
+            raise
         except PermissionError as e:
             click.echo(f"Error: Permission denied accessing root directory: {e}", err=True)
-            return ""
+            return False
         except Exception as e:
             click.echo(f"Error: Failed to generate directory tree: {e}", err=True)
-            return ""
+            return False
+
+    def generate(self) -> str:
+        """Generate the complete tree structure starting from root."""
+        out: list[str] = []
+        return ''.join(out) if self.emit(out.append) else ""
+
+def _default_cache_dir() -> Path:
+    """Return the per-user cache directory, honouring XDG_CACHE_HOME."""
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'treecopy'
 
 @click.command()
 @click.argument('path', type=click.Path(exists=True, path_type=Path))
 @click.option('--clipboard/--no-clipboard', default=True, help='Copy to clipboard')
 @click.option('--ignore', '-i', multiple=True, help='Additional patterns to ignore')
-def cli(path: Path, clipboard: bool, ignore: tuple[str, ...]):
+@click.option('--cache/--no-cache', default=False, help='Reuse the last tree if no directory changed')
+def cli(path: Path, clipboard: bool, ignore: tuple[str, ...], cache: bool):
     """Generate a tree structure of the specified directory and optionally copy to clipboard."""
     try:
         # Combine default patterns with any additional patterns from CLI
         ignore_patterns = DirectoryTree.DEFAULT_IGNORE_PATTERNS | set(ignore)
         
-        tree_generator = DirectoryTree(path, ignore_patterns=ignore_patterns)
+        cache_dir = _default_cache_dir() if cache else None
+        tree_generator = DirectoryTree(path, ignore_patterns=ignore_patterns, cache_dir=cache_dir)
+
+        # Without the clipboard there is no need to hold the tree, so stream it
+        if not clipboard:
+            try:
+                if tree_generator.emit(functools.partial(click.echo, nl=False)):
+                    click.echo()
+            except BrokenPipeError:
+                # Output was piped into something like head; silence the final flush at exit
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return
+
         tree = tree_generator.generate()
         
         if not tree:
@@ -156,15 +502,14 @@ def cli(path: Path, clipboard: bool, ignore: tuple[str, ...]):
         # Print the tree
         click.echo(tree)
         
-        # Copy to clipboard if requested
-        if clipboard:
-            try:
-                pyperclip.copy(tree)
-                click.echo("Tree structure copied to clipboard!", err=True)
-            except pyperclip.PyperclipException:
-                click.echo("Failed to copy to clipboard - clipboard access denied", err=True)
-            except Exception as e:
-                click.echo(f"Failed to copy to clipboard: {e}", err=True)
+        # Copy to clipboard
+        try:
+            pyperclip.copy(tree)
+            click.echo("Tree structure copied to clipboard!", err=True)
+        except pyperclip.PyperclipException:
+            click.echo("Failed to copy to clipboard - clipboard access denied", err=True)
+        except Exception as e:
+            click.echo(f"Failed to copy to clipboard: {e}", err=True)
     
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
@@ -0,0 +1,90 @@
+import os
+import time
+
+import pytest
+
+from treecopy import cli
+from treecopy.cli import DirectoryTree
+
+HOUR_NS = 3600 * 1_000_000_000
+
+
+def age_directories(root):
+    """Move every directory's mtime an hour back, outside the race window."""
+    old_ns = time.time_ns() - HOUR_NS
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, ns=(old_ns, old_ns))
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / 'proj'
+    (root / 'src' / 'pkg').mkdir(parents=True)
+    (root / 'src' / 'pkg' / 'mod.py').touch()
+    (root / 'README.md').touch()
+    age_directories(root)
+    return root
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return tmp_path / 'cache'
+
+
+def fail_scan(directory):
+    raise AssertionError(f"unexpected scan of {directory}")
+
+
+def test_unchanged_tree_is_served_from_cache(project, cache_dir):
+    tree = DirectoryTree(project, cache_dir=cache_dir).generate()
+    assert len(list(cache_dir.glob('*.json'))) == 1
+
+    cached = DirectoryTree(project, cache_dir=cache_dir)
+    cached._scan = fail_scan
+    assert cached.generate() == tree
+
+
+def test_added_entry_invalidates_cache(project, cache_dir):
+    DirectoryTree(project, cache_dir=cache_dir).generate()
+
+    (project / 'src' / 'pkg' / 'new.py').touch()
+
+    assert 'new.py' in DirectoryTree(project, cache_dir=cache_dir).generate()
+
+
+def test_recently_modified_directory_is_not_cached(project, cache_dir):
+    (project / 'src' / 'late.py').touch()
+
+    tree = DirectoryTree(project, cache_dir=cache_dir).generate()
+
+    assert 'late.py' in tree
+    assert not cache_dir.exists() or not list(cache_dir.glob('*.json'))
+
+
+def test_scan_errors_do_not_disable_cache_for_later_runs(project, cache_dir):
+    tree = DirectoryTree(project, cache_dir=cache_dir)
+    scan = tree._scan
+
+    def scan_denying_pkg(directory):
+        if os.path.basename(directory) == 'pkg':
+            raise PermissionError("denied")
+        return scan(directory)
+
+    tree._scan = scan_denying_pkg
+    tree.generate()
+    assert not cache_dir.exists() or not list(cache_dir.glob('*.json'))
+
+    tree._scan = scan
+    tree.generate()
+    assert len(list(cache_dir.glob('*.json'))) == 1
+
+
+def test_failed_cache_write_leaves_no_temporary_file(project, cache_dir, monkeypatch):
+    def fail_dump(obj, f):
+        f.write('{')
+        raise OSError("disk full")
+
+    monkeypatch.setattr(cli.json, 'dump', fail_dump)
+    DirectoryTree(project, cache_dir=cache_dir).generate()
+
+    assert list(cache_dir.iterdir()) == []
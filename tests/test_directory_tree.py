@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from treecopy.cli import DirectoryTree
+
+
+def make_tree(root: Path, files: list[str], gitignore: str | None = None) -> Path:
+    """Create the given files (and their parent directories) below root."""
+    for name in files:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    if gitignore is not None:
+        (root / '.gitignore').write_text(gitignore)
+    return root
+
+
+def test_directory_only_rule_prunes_directory(tmp_path):
+    root = make_tree(tmp_path / 'proj', ['build/out.o', 'src/main.py'], 'build/\n')
+
+    assert DirectoryTree(root).generate() == (
+        "proj/\n"
+        "├── src/\n"
+        "│   └── main.py\n"
+        "└── .gitignore\n"
+    )
+
+
+def test_double_star_rule_keeps_negated_children(tmp_path):
+    # git ls-files tracks a/b/keep.txt with these rules, so a/ must not be pruned
+    root = make_tree(tmp_path / 'proj', ['a/b/keep.txt', 'a/c/x', 'a/top'], 'a/**\n!a/b\n!a/b/**\n')
+
+    assert DirectoryTree(root).generate() == (
+        "proj/\n"
+        "├── a/\n"
+        "│   └── b/\n"
+        "│       └── keep.txt\n"
+        "└── .gitignore\n"
+    )
+
+
+def test_double_star_rule_with_negated_extension(tmp_path):
+    root = make_tree(tmp_path / 'proj', ['docs/index.md', 'docs/notes.txt', 'docs/sub/page.md'],
+                     'docs/**\n!docs/*.md\n')
+
+    assert DirectoryTree(root).generate() == (
+        "proj/\n"
+        "├── docs/\n"
+        "│   └── index.md\n"
+        "└── .gitignore\n"
+    )
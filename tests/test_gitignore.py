@@ -0,0 +1,78 @@
+import itertools
+import random
+
+import pathspec
+import pytest
+
+from treecopy.cli import _combine_gitignore, _compile_gitignore, _directory_lines
+
+PATTERNS = [
+    'build/',
+    '*.log',
+    '!keep.log',
+    'a/**',
+    '!a/b',
+    '!a/b/**',
+    'docs/*.md',
+    '!docs/index.md',
+    '/root.txt',
+    'x*',
+    '!xy*',
+]
+
+TOKENS = ['a', 'b', 'c', 'build', 'docs', 'keep.log', 'err.log', 'index.md', 'root.txt', 'xy', 'xz']
+
+# Every path up to three components deep, as a file and as a directory
+PATHS = [
+    '/'.join(parts) + suffix
+    for depth in range(1, 4)
+    for parts in itertools.product(TOKENS, repeat=depth)
+    for suffix in ('', '/')
+]
+
+
+def spec_from(lines):
+    return pathspec.PathSpec.from_lines(pathspec.patterns.GitWildMatchPattern, lines)
+
+
+def assert_equivalent(spec):
+    regex = _combine_gitignore(spec)
+    assert regex is not None
+    mismatches = [path for path in PATHS if spec.match_file(path) != (regex.match(path) is not None)]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_combined_regex_matches_spec_for_any_ordering(seed):
+    lines = random.Random(seed).sample(PATTERNS, len(PATTERNS))
+
+    assert_equivalent(spec_from(lines))
+    assert_equivalent(spec_from(_directory_lines(lines)))
+
+
+@pytest.mark.parametrize('lines', [
+    ['!keep.log', '*.log'],
+    ['*.log', '!keep.log', 'keep.log'],
+    ['a/**', '!a/b', '!a/b/**'],
+    ['docs/**', '!docs/*.md'],
+])
+def test_combined_regex_matches_spec_for_negation_orderings(lines):
+    assert_equivalent(spec_from(lines))
+    assert_equivalent(spec_from(_directory_lines(lines)))
+
+
+def test_double_star_rule_does_not_match_its_directory(tmp_path):
+    gitignore = tmp_path / '.gitignore'
+    gitignore.write_text('a/**\n!a/b\n!a/b/**\n')
+    st = gitignore.stat()
+    compiled = _compile_gitignore(str(gitignore), st.st_mtime_ns, st.st_size)
+
+    assert compiled.file_re is not None and compiled.dir_re is not None
+    for regex, path, ignored in [
+        (compiled.dir_re, 'a', False),
+        (compiled.dir_re, 'a/b', False),
+        (compiled.dir_re, 'a/c', True),
+        (compiled.file_re, 'a/top', True),
+        (compiled.file_re, 'a/b/keep.txt', False),
+    ]:
+        assert (regex.match(path) is not None) == ignored, path